@@ -1,4 +1,51 @@
-"""Library for creating 2D geometrical optics simulations."""
+"""
+Library for creating 2D geometrical optics simulations.
 
-from base import *
-from standard import *
+The contents of the base, standard and scene modules are available directly
+from this package, but they (and NumPy along with them) are only imported the
+first time one of them is accessed.  This keeps importing the package itself
+nearly free, which matters for short jobs and spawned worker processes.
+"""
+
+import sys
+import types
+
+_submodules = ['base', 'standard', 'scene']
+
+
+class _LazyPackage(types.ModuleType):
+    """A package which imports its submodules on first attribute access."""
+
+    def __getattr__(self, name):
+        # only called when normal attribute lookup fails
+        if name.startswith('__') and name != '__all__':
+            raise AttributeError(name)
+        self._load()
+        if name == '__all__':
+            return self._exports
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def _load(self):
+        if '_exports' in self.__dict__:
+            return
+
+        exports = []
+        for submodule in _submodules:
+            __import__(self.__name__ + '.' + submodule)
+            module = sys.modules[self.__name__ + '.' + submodule]
+            for name, value in vars(module).items():
+                if not name.startswith('_'):
+                    setattr(self, name, value)
+                    if name not in exports:
+                        exports.append(name)
+        self._exports = exports
+
+
+_package = _LazyPackage(__name__, __doc__)
+_package.__dict__.update(sys.modules[__name__].__dict__)
+# keep the original module alive; otherwise Python 2 clears its globals
+_package._module = sys.modules[__name__]
+sys.modules[__name__] = _package
@@ -1,3 +1,7 @@
+import numpy as np
+
+import util
+
 
 class PropagationException(Exception):
     """
@@ -43,6 +47,15 @@ class Ray(object):
     This Ray class keeps track of its x-position, z-position, angle, and
     amplitude.  The angle (in radians) is relative to the positive z-axis.
 
+    Rays also expose their direction as a unit vector, "direction", which is
+    kept in sync with the angle.  The direction vector is computed lazily and
+    cached until a new angle is assigned, so optical elements can use it
+    without repeatedly evaluating trigonometric functions (the angle must be
+    replaced rather than modified in place for this to work).  Elements that
+    compute a new direction vector directly (e.g. using Snell's law in vector
+    form) should use "set_direction", which updates the angle without
+    throwing the vector away.
+
     Instances of this class also keep a list of references to "child rays",
     rays that were created directly from this ray.  For example reflections
     would be considered child rays.
@@ -54,19 +67,47 @@ class Ray(object):
     method is necessary is when one wants to trace the path of a ray through a
     system; in order for a ray to remember its history, it must 
 
+    Rays may carry a vector of wavelengths, in which case x, th and a (and
+    possibly z) are arrays with one entry per wavelength, and the ray stands
+    for a bundle of rays which share their source geometry.  This lets all of
+    the wavelengths be traced in a single vectorized pass.  Optical elements
+    should handle such rays elementwise; when only some of the wavelengths
+    are absorbed, their amplitude is set to zero.  Rays without a wavelength
+    always hold scalars, so elements may keep a faster scalar path for them.
+
     In general, one may be interested in modeling polarization, phase, and
     or other quantities, so more complex ray objects are possible.  This class
     defines the simplest Ray class; other ray models must implement at least
     the quantities represented by this class.
     """
 
-    def __init__(self, x, th, a=1.0, z=0.0):
+    # class level defaults keep creating the common, scalar rays cheap; the
+    # angle is a plain attribute, and _direction_th is the angle which the
+    # cached direction vector belongs to
+    wavelength = None
+    _direction_th = None
+
+    def __init__(self, x, th, a=1.0, z=0.0, wavelength=None):
         self.x = x
         self.th = th
         self.z = z
         self.a = a
+        if wavelength is not None:
+            self.wavelength = wavelength
         self.children = []
 
+    @property
+    def direction(self):
+        if self._direction_th is not self.th:
+            self._direction = util.direction(self.th)
+            self._direction_th = self.th
+        return self._direction
+
+    def set_direction(self, kz, kx):
+        self.th = util.angle(kz, kx)
+        self._direction = (kz, kx)
+        self._direction_th = self.th
+
     def save(self):
         pass
 
@@ -81,10 +122,32 @@ class Source(object):
 
     Optical sources are iterators that return rays.  The only required argument
     is the Ray class that is used to create rays.
+
+    Sources may also be given a vector of "wavelengths", in which case every
+    ray they create is broadcast across all of the wavelengths.
+
+    Sources whose set of rays is mirror-symmetric about x=0 (i.e. for every ray
+    (x, th) the source also emits (-x, -th)) should set "symmetric" to True.
     """
 
+    symmetric = False
+
     def __init__(self, **kwargs):
         self.Ray = kwargs.pop('Ray', Ray)
+        wavelengths = kwargs.pop('wavelengths', None)
+        if wavelengths is not None:
+            wavelengths = np.asarray(wavelengths, dtype=float)
+        self.wavelengths = wavelengths
+
+    def create_ray(self, x, th, a=1.0):
+        if self.wavelengths is None:
+            return self.Ray(x, th, a=a)
+
+        shape = self.wavelengths.shape
+        return self.Ray(np.full(shape, x, dtype=float),
+                        np.full(shape, th, dtype=float),
+                        a=np.full(shape, a, dtype=float),
+                        wavelength=self.wavelengths)
 
     def __iter__(self):
         return self
@@ -119,9 +182,29 @@ class OpticalElement(object):
     of the Bead element side-by-side on the x-axis.  It would be possible to
     create a Bead element and place them side by side along the z-axis, or even
     to create an optical element that has several beads that it keeps track of
-    internally.
+    internally.  Setups which need freely placed components should use the
+    non-sequential Scene simulation (see scene.py) instead.
+
+    Optical elements which are mirror-symmetric about x=0 should set
+    "symmetric" to True, which allows simulations to skip tracing mirrored
+    rays (see Simulation).
+
+    Paraxial optical elements, which act on (x, th) as a linear map, may
+    implement a "transfer_matrix" method returning the map's ABCD matrix as
+    ((A, B), (C, D)).  Elements which absorb every ray outside an interval of
+    the x-axis may implement a "limits" method returning (left, right).
+    Simulations use these to reject doomed rays at the source (see
+    AcceptanceRegion).
     """
 
+    symmetric = False
+
+    def transfer_matrix(self):
+        return None
+
+    def limits(self):
+        return None
+
     def propagate(self, ray):
         raise NotImplementedError
 
@@ -130,6 +213,15 @@ class OpticalElement(object):
 
 
 class Detector(object):
+    """
+    An abstract class representing a detector.
+
+    Detectors whose data can be reconstructed from only the rays in the x > 0
+    half-space should set "symmetric" to True and implement a "mirror" method,
+    which adds the mirror image of the detected data to itself.
+    """
+
+    symmetric = False
 
     def __init__(self, name, *args, **kwargs):
         self.name = name
@@ -137,6 +229,16 @@ class Detector(object):
     def detect(self, ray):
         raise NotImplementedError
 
+    def mirror(self):
+        raise NotImplementedError
+
+    def check_wavelengths(self, wavelengths):
+        """
+        Called before a simulation runs with the wavelengths of its source (or
+        None); detectors which can't handle them should raise a ValueError.
+        """
+        pass
+
     def post_process(self):
         pass
 
@@ -144,11 +246,81 @@ class Detector(object):
         raise NotImplementedError
 
 
+class AcceptanceRegion(object):
+    """
+    The region of source (x, th) space which passes every stop in the leading
+    paraxial part of a setup.
+
+    The leading part of the setup is every optical element up to the first
+    detector or non-paraxial optical element.  Multiplying the transfer
+    matrices of these elements gives, at each stop, the ray's x-position as a
+    linear function of its source position and angle, so each stop limits the
+    source rays to a strip of (x, th) space; the acceptance region is the
+    intersection of these strips.
+    """
+
+    # rays this close to the edge of a stop are accepted; they are still
+    # absorbed by the stop itself if need be
+    TOLERANCE = 1e-9
+
+    def __init__(self, setup):
+        self.constraints = []
+
+        m = ((1.0, 0.0), (0.0, 1.0))
+        for obj in setup:
+            if not isinstance(obj, OpticalElement):
+                break
+            matrix = obj.transfer_matrix()
+            if matrix is None:
+                break
+
+            limits = obj.limits()
+            if limits is not None:
+                left, right = limits
+                self.constraints.append((m[0][0], m[0][1],
+                        left - self.TOLERANCE, right + self.TOLERANCE))
+
+            (a, b), (c, d) = matrix
+            m = ((a*m[0][0] + b*m[1][0], a*m[0][1] + b*m[1][1]),
+                 (c*m[0][0] + d*m[1][0], c*m[0][1] + d*m[1][1]))
+
+    def accepts(self, x, th):
+        """Accepts scalars or arrays."""
+        inside = True
+        for a, b, left, right in self.constraints:
+            x_stop = a*x + b*th
+            inside = inside & (x_stop >= left) & (x_stop <= right)
+        return inside
+
+
 class Simulation(object):
+    """
+    A sequential simulation, which passes each ray from the source through
+    every object in the setup in order.
+
+    Many setups are mirror-symmetric about x=0; in this case only the rays in
+    one half-space need to be traced, and the detectors can reconstruct the
+    other half.  Symmetry can be declared by setting "symmetric" to True, or
+    detected from the source, optical elements and detectors by setting it to
+    "auto".
+
+    If "prefilter" is True, source rays which can not pass the stops in the
+    leading paraxial part of the setup (see AcceptanceRegion) are rejected
+    before they are traced.  Rejected rays are counted in "num_rejected" and
+    passed to handle_absorbed_ray, as they would have been absorbed.
+    """
+
+    # rays closer than this to the axis are considered to lie on it
+    SYMMETRY_TOLERANCE = 1e-12
 
-    def __init__(self, source, setup):
+    def __init__(self, source, setup, symmetric=False, prefilter=False):
         self.source = source
         self.setup = setup
+        self.symmetric = symmetric
+        self.use_symmetry = False
+        self.prefilter = prefilter
+        self.acceptance = None
+        self.num_rejected = 0
 
     @property
     def detectors(self):
@@ -166,13 +338,63 @@ class Simulation(object):
             z += oe.dz()
             oe.z_back = z
 
+        if self.symmetric == 'auto':
+            self.use_symmetry = self.detect_symmetry()
+        elif self.symmetric:
+            for d in self.detectors:
+                if not d.symmetric:
+                    raise ValueError("Detector '{}' can not reconstruct "
+                                     "mirrored rays.".format(d.name))
+            self.use_symmetry = True
+        else:
+            self.use_symmetry = False
+
+        wavelengths = getattr(self.source, 'wavelengths', None)
+        for d in self.detectors:
+            d.check_wavelengths(wavelengths)
+
+        self.acceptance = None
+        self.num_rejected = 0
+        if self.prefilter:
+            acceptance = AcceptanceRegion(self.setup)
+            if acceptance.constraints:
+                self.acceptance = acceptance
+
+    def detect_symmetry(self):
+        objects = [self.source] + self.setup + self.detectors
+        return all(getattr(obj, 'symmetric', False) for obj in objects)
+
+    def in_half_space(self, ray):
+        """
+        Return True if the ray must be traced when using symmetry.  Rays on the
+        axis are their own mirror image, so their amplitude is halved.
+        """
+        # rays broadcast across wavelengths are identical at the source
+        x = np.max(ray.x)
+        th = np.max(ray.th)
+
+        tolerance = self.SYMMETRY_TOLERANCE
+        if x > tolerance:
+            return True
+        if x < -tolerance:
+            return False
+        if th > tolerance:
+            return True
+        if th < -tolerance:
+            return False
+        ray.a = ray.a/2.0
+        return True
+
+    def trace(self, ray):
+        for obj in self.setup:
+            if isinstance(obj, Detector):
+                obj.detect(ray)
+            if isinstance(obj, OpticalElement):
+                obj.propagate(ray)
+
     def propagate(self, ray):
         try:
-            for obj in self.setup:
-                if isinstance(obj, Detector):
-                    obj.detect(ray)
-                if isinstance(obj, OpticalElement):
-                    obj.propagate(ray)
+            self.trace(ray)
         except AbsorbedRay as e:
             self.handle_absorbed_ray(e.ray)
         except EscapedRay as e:
@@ -196,6 +418,8 @@ class Simulation(object):
 
     def post_process(self):
         for d in self.detectors:
+            if self.use_symmetry:
+                d.mirror()
             d.post_process()
 
     def report(self):
@@ -207,6 +431,12 @@ class Simulation(object):
     def run(self):
         self.pre_process()
         for ray in self.source:
+            if self.use_symmetry and not self.in_half_space(ray):
+                continue
+            if self.acceptance and not np.any(self.acceptance.accepts(ray.x, ray.th)):
+                self.num_rejected += 1
+                self.handle_absorbed_ray(ray)
+                continue
             self.propagate(ray)
         self.post_process()
         return self.report()
@@ -0,0 +1,54 @@
+"""
+Benchmark the cold import time of the geometric package.
+
+Each measurement imports the package in a fresh Python process, so nothing is
+cached in memory between runs (the operating system's file cache still is).
+Run it from anywhere with
+
+    python bench_import.py [repeats]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+# the directory which contains the geometric package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = [
+    ('python startup', 'pass'),
+    ('import geometric', 'import geometric'),
+    ('first use of geometric', 'import geometric; geometric.Simulation'),
+    ('import geometric.visualization', 'import geometric.visualization'),
+    ('import numpy', 'import numpy'),
+]
+
+def cold_import_time(statement, repeats):
+    times = []
+    for i in range(repeats):
+        start = time.time()
+        subprocess.check_call([sys.executable, '-c', statement], cwd=ROOT)
+        times.append(time.time() - start)
+    times.sort()
+    return times[0], times[len(times)//2]
+
+def loaded_modules(statement, modules):
+    check = '; '.join([statement, 'import sys',
+                       'print(" ".join(m for m in {!r} if m in sys.modules))'.format(modules)])
+    output = subprocess.check_output([sys.executable, '-c', check], cwd=ROOT)
+    return output.decode().split()
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print('{:<32} {:>12} {:>12}'.format('', 'min (ms)', 'median (ms)'))
+    for name, statement in STATEMENTS:
+        best, median = cold_import_time(statement, repeats)
+        print('{:<32} {:>12.1f} {:>12.1f}'.format(name, 1e3*best, 1e3*median))
+
+    heavy = ['numpy', 'matplotlib', 'pylab']
+    loaded = loaded_modules('import geometric', heavy)
+    print('modules loaded by "import geometric": {}'.format(', '.join(loaded) or 'none'))
+
+if __name__ == '__main__':
+    main()
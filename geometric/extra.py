@@ -1,7 +1,10 @@
-from math import sqrt, cos, sin, tan, acos, asin, atan, pi
+import math
+from math import pi
 
-from base import OpticalElement
-from util import ray_coordinates, standard_coordinates, quadrant_atan
+import numpy as np
+
+from base import OpticalElement, EscapedRay
+from util import ray_coordinates, refract, angle, direction, refractive_index, select, sqrt, SCALARS
 
 class PartionedApertureLens(OpticalElement):
 
@@ -10,95 +13,287 @@ class PartionedApertureLens(OpticalElement):
         self.lens_separation = lens_separation
 
     def propagate(self, ray):
-        if ray.x > 0:
-            x_effective = ray.x - self.lens_separation
-        else:
-            x_effective = ray.x + self.lens_separation
+        x_effective = select(ray.x > 0, ray.x - self.lens_separation,
+                             ray.x + self.lens_separation)
         ray.th = ray.th - x_effective/self.f
 
     def dz(self):
         return 0.0
 
 
+class BeadTable(object):
+    """
+    A lookup table of the transfer map of a bead.
+
+    Because a bead is rotationally symmetric, the path of a ray through it
+    depends only on the ray's impact parameter s, the signed distance from the
+    bead center to the ray's line in units of the bead radius.  The map from
+    an incoming (x, th) to an outgoing (x, th, z) therefore reduces to two
+    functions of s: the angle by which the ray is deviated, and the angle,
+    measured from the incoming ray direction, of the exit point around the
+    bead center.  Both functions have infinite slope at grazing incidence, so
+    they are tabulated against an angle instead: the angle of incidence,
+    asin(s), or for a bead with a lower refractive index than its surroundings
+    the angle of refraction inside the bead, which stays smooth up to the
+    critical angle.  Rays beyond the critical angle are totally internally
+    reflected at the entrance point; the map jumps there, so they aren't part
+    of the table, and are handled exactly instead.  The grid is refined until
+    linear interpolation between grid points is within the tolerance, or the
+    grid spacing reaches "min_step".
+
+    After construction, "error" holds the largest interpolation error (in
+    radians) of either function, measured at the midpoint of every table
+    interval, which is where the error of linear interpolation peaks.
+    """
+
+    def __init__(self, n_bead, n_surround=1.0, tolerance=1e-6, min_step=1e-9):
+        self.n_bead = n_bead
+        self.n_surround = n_surround
+        self.tolerance = tolerance
+        # the sine of the tabulated angle is s*scale
+        self.scale = max(1.0, float(n_surround)/n_bead)
+
+        # exactly grazing rays are degenerate, so the table stops just short
+        angles = np.linspace(-pi/2 + min_step, pi/2 - min_step, 33)
+        exit_angle, deviation = self.solve(angles)
+        while True:
+            mid = (angles[:-1] + angles[1:])/2.0
+            mid_exit_angle, mid_deviation = self.solve(mid)
+            error = np.maximum(
+                    abs(mid_exit_angle - (exit_angle[:-1] + exit_angle[1:])/2.0),
+                    abs(mid_deviation - (deviation[:-1] + deviation[1:])/2.0))
+            refine = (error > tolerance) & (np.diff(angles) > 2*min_step)
+            if not refine.any():
+                break
+
+            angles = np.concatenate((angles, mid[refine]))
+            exit_angle = np.concatenate((exit_angle, mid_exit_angle[refine]))
+            deviation = np.concatenate((deviation, mid_deviation[refine]))
+            order = np.argsort(angles)
+            angles = angles[order]
+            exit_angle = exit_angle[order]
+            deviation = deviation[order]
+
+        self.angles = angles
+        self.exit_angle = exit_angle
+        self.deviation = deviation
+        self.error = error.max()
+
+    def solve(self, angles):
+        """
+        Exactly trace rays through a bead of unit radius centered on the
+        origin, for rays traveling along the z-axis which hit the bead at the
+        given (tabulated) angles.
+        """
+        s = np.sin(angles)/self.scale
+        # -sqrt(1 - s**2), written so that it's accurate for grazing rays
+        z = -np.sqrt(self.scale**2 - 1 + np.cos(angles)**2)/self.scale
+        kz, kx = refract(1.0, 0.0, z, s, self.n_surround/self.n_bead)
+        pathlength_in_bead = -2*(z*kz + s*kx)
+        z_exit = z + pathlength_in_bead*kz
+        x_exit = s + pathlength_in_bead*kx
+        kz, kx = refract(kz, kx, -z_exit, -x_exit, self.n_bead/self.n_surround)
+        return angle(z_exit, x_exit), angle(kz, kx)
+
+    def lookup(self, s):
+        """Return the exit angle and deviation for impact parameters s."""
+        if isinstance(s, SCALARS):
+            s = min(max(s, -1.0), 1.0)
+            if abs(s)*self.scale > 1:
+                # reflected at the entrance point, at an angle of incidence i
+                incidence = math.asin(s)
+                reflection = math.copysign(pi, s) - incidence
+                return reflection, reflection - incidence
+            angles = math.asin(s*self.scale)
+            return (np.interp(angles, self.angles, self.exit_angle),
+                    np.interp(angles, self.angles, self.deviation))
+
+        s = np.clip(s, -1, 1)
+        angles = np.arcsin(np.clip(s*self.scale, -1, 1))
+        exit_angle = np.interp(angles, self.angles, self.exit_angle)
+        deviation = np.interp(angles, self.angles, self.deviation)
+        if self.scale > 1:
+            reflected = abs(s)*self.scale > 1
+            incidence = np.arcsin(s)
+            reflection = np.copysign(pi, s) - incidence
+            exit_angle = np.where(reflected, reflection, exit_angle)
+            deviation = np.where(reflected, reflection - incidence, deviation)
+        return exit_angle, deviation
+
+
+# tables only depend on the refractive indices, so they are shared between
+# beads with different radii and positions
+_bead_tables = {}
+
+def bead_table(n_bead, n_surround=1.0, tolerance=1e-6):
+    key = (n_bead, n_surround, tolerance)
+    if key not in _bead_tables:
+        _bead_tables[key] = BeadTable(n_bead, n_surround, tolerance)
+    return _bead_tables[key]
+
+
 class Bead(OpticalElement):
+    """
+    A circular bead which fills the segment of the z-axis given by its
+    diameter, and is centered at x.
+
+    If "tabulated" is True, rays are propagated through the bead using a
+    BeadTable instead of solving for their path exactly; in this case the
+    ray's save method is invoked at the exit point but not at the entrance
+    point.  A ValueError is raised if the table can't reach the tolerance.
+    """
 
-    def __init__(self, radius, x, n_bead, n_surround=1.0):
+    def __init__(self, radius, x, n_bead, n_surround=1.0, tabulated=False,
+                 tolerance=1e-6):
         self.radius = radius
         self.x = x
         self.n_bead = n_bead
         self.n_surround = n_surround
+        if tabulated:
+            if callable(n_bead) or callable(n_surround):
+                raise ValueError("Dispersive beads can not be tabulated.")
+            self.table = bead_table(n_bead, n_surround, tolerance)
+            if self.table.error > tolerance:
+                raise ValueError("The bead table only reaches an error of {:g}, "
+                                 "above the tolerance of {:g}.".format(
+                                     self.table.error, tolerance))
+        else:
+            self.table = None
+
+    @property
+    def symmetric(self):
+        return self.x == 0
+
+    def center(self):
+        return self.z_front + self.radius, self.x
+
+    def eta(self, ray):
+        """The ratio of the surrounding and bead refractive indices."""
+        n_bead = refractive_index(self.n_bead, ray.wavelength)
+        n_surround = refractive_index(self.n_surround, ray.wavelength)
+        return n_surround/n_bead
 
     def intersect(self, ray):
-        x_bead = self.x
-        z_bead = self.radius
-        x_bead_r, z_bead_r = ray_coordinates(ray, x_bead, z_bead)
-        return abs(x_bead_r) < self.radius
+        z_bead, x_bead = self.center()
+        x_bead_r, z_bead_r = ray_coordinates(ray, x_bead, z_bead - ray.z)
+        return (abs(x_bead_r) < self.radius) & (z_bead_r > 0)
 
-    def enter(self, ray):
+    def enter(self, ray, hit=True):
+        """
+        Refract the ray into the bead.  Returns which rays entered the bead;
+        rays which are totally internally reflected (e.g. by a bead with a
+        lower refractive index than its surroundings) stay outside of it.
+        """
         radius = self.radius
-        
+        z_bead, x_bead = self.center()
+        kz, kx = ray.direction
+
         # calculate bead center in ray-coordinates
-        x_bead = self.x
-        z_bead = self.radius
-        x_bead_r, z_bead_r = ray_coordinates(ray, x_bead, z_bead)
+        x_bead_r, z_bead_r = ray_coordinates(ray, x_bead, z_bead - ray.z)
 
-        # use equation-of-a-circle to determine intersect point
+        # use equation-of-a-circle to determine the distance to the intersect
+        # point along the ray
         bead_thickness_at_intersect = sqrt(radius**2 - x_bead_r**2)
-        x_intersect_r = 0
-        z_intersect_r = z_bead_r - bead_thickness_at_intersect
+        distance = z_bead_r - bead_thickness_at_intersect
+        x = ray.x + distance*kx
+        z = ray.z + distance*kz
+
+        # use the surface normal and snell's law to calculate the ray bending
+        # at the surface
+        nz = (z - z_bead)/radius
+        nx = (x - x_bead)/radius
+        eta = self.eta(ray)
+        kz_new, kx_new = refract(kz, kx, nz, nx, eta)
+        reflected = eta**2*(1 - (kz*nz + kx*nx)**2) > 1
 
-        # use first derivative of the equation-of-a-circle and snell's law to
-        # calculate the ray bending at the surface
-        theta1_r = atan(x_bead_r/sqrt(radius**2 - x_bead_r**2))
-        theta2_r = asin(self.n_surround/self.n_bead*sin(theta1_r))
+        ray.x = select(hit, x, ray.x)
+        ray.z = select(hit, z, ray.z)
+        ray.set_direction(select(hit, kz_new, kz), select(hit, kx_new, kx))
+        ray.save()
+        if ray.wavelength is None:
+            return hit and not reflected
+        return hit & ~reflected
+
+    def exit(self, ray, hit=True):
+        radius = self.radius
+        z_bead, x_bead = self.center()
+        kz, kx = ray.direction
+
+        # the path inside the bead is a chord; its length follows from the
+        # projection of the entrance-to-center vector onto the ray direction
+        pathlength_in_bead = 2*((z_bead - ray.z)*kz + (x_bead - ray.x)*kx)
+        x = ray.x + pathlength_in_bead*kx
+        z = ray.z + pathlength_in_bead*kz
 
-        # convert back to standard coordinates
-        x_intersect, z_intersect = standard_coordinates(ray, x_intersect_r, z_intersect_r)
-        theta2 = ray.th + theta2_r
+        # calculate the exit angle; the normal points back into the bead
+        nz = (z_bead - z)/radius
+        nx = (x_bead - x)/radius
+        kz_new, kx_new = refract(kz, kx, nz, nx, 1.0/self.eta(ray))
 
-        ray.x = x_intersect
-        ray.z += z_intersect
-        ray.th = theta2
+        ray.x = select(hit, x, ray.x)
+        ray.z = select(hit, z, ray.z)
+        ray.set_direction(select(hit, kz_new, kz), select(hit, kx_new, kx))
         ray.save()
 
-    def exit(self, ray):
-        # Use the cosine law with the triangle formed by the
-        # raypath-inside-the- bead, the ray-entrance-to-center, and the
-        # ray-exit-to-center.  The cosine law gives the length of the raypath
-        # inside the bead, which can be used to find the exit location.
-        dx = self.x - ray.x
-        dz = self.z_front + self.radius - ray.z
-        xaxis_bead_angle = quadrant_atan(dx, dz)
-        xaxis_ray_angle = pi/2.0 - ray.th
-        bead_ray_angle = abs(xaxis_ray_angle - xaxis_bead_angle)
-        pathlength_in_bead = 2*self.radius*cos(bead_ray_angle)
-
-        import pprint
-        xaxis_bead_angle_deg = round(xaxis_bead_angle*180/pi, 2)
-        xaxis_ray_angle_deg = round(xaxis_ray_angle*180/pi, 2)
-        print(xaxis_bead_angle_deg, xaxis_ray_angle_deg, xaxis_ray_angle_deg -  xaxis_bead_angle_deg)
-        #pprint.pprint(locals())
-
-        ray.x += pathlength_in_bead*cos(xaxis_ray_angle)
-        ray.z += pathlength_in_bead*sin(xaxis_ray_angle)
-
-        # calculate the exit angle
-        # TODO
-        ray.th = 0
+    def transfer(self, ray, hit=True):
+        """Move the ray from its entrance point to its exit point using the table."""
+        radius = self.radius
+        z_bead, x_bead = self.center()
+        kz, kx = ray.direction
+
+        s = ((z_bead - ray.z)*kx - (x_bead - ray.x)*kz)/radius
+        exit_angle, deviation = self.table.lookup(s)
 
+        cos_exit, sin_exit = direction(exit_angle)
+        z = z_bead + radius*(cos_exit*kz - sin_exit*kx)
+        x = x_bead + radius*(cos_exit*kx + sin_exit*kz)
+
+        ray.x = select(hit, x, ray.x)
+        ray.z = select(hit, z, ray.z)
+        ray.th = ray.th + select(hit, deviation, 0.0)
         ray.save()
 
     def to_exit_plane(self, ray, z_final):
+        kz, kx = ray.direction
+        if ray.wavelength is None:
+            if kz <= 0:
+                raise EscapedRay(ray)
+            distance = z_final - ray.z
+            ray.x = ray.x + kx/kz*distance
+            ray.z = z_final
+            ray.save()
+            return
+
+        escaped = kz <= 0
+        if np.all(escaped):
+            raise EscapedRay(ray)
+        if np.any(escaped):
+            # only some wavelengths escaped; they are dropped
+            ray.a = select(escaped, 0.0, ray.a)
+            kz = select(escaped, 1.0, kz)
         distance = z_final - ray.z
-        ray.x = ray.x + tan(ray.th)*distance
+        ray.x = ray.x + kx/kz*distance
         ray.z = z_final
         ray.save()
 
     def propagate(self, ray):
         z_final = ray.z + self.dz()
-        if self.intersect(ray):
-            self.enter(ray)
-            self.exit(ray)
+        hit = self.intersect(ray)
+        if ray.wavelength is None:
+            if hit:
+                if self.table is not None:
+                    self.transfer(ray)
+                elif self.enter(ray):
+                    self.exit(ray)
+        elif np.any(hit):
+            # rays that miss the bead produce NaNs, which are discarded
+            with np.errstate(invalid='ignore'):
+                if self.table is not None:
+                    self.transfer(ray, hit)
+                else:
+                    entered = self.enter(ray, hit)
+                    if np.any(entered):
+                        self.exit(ray, entered)
         self.to_exit_plane(ray, z_final)
 
     def dz(self):
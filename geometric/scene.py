@@ -0,0 +1,352 @@
+"""
+Non-sequential scenes.
+
+A Scene is a simulation whose elements are not laid out end to end along the
+z-axis.  Each element occupies an arbitrary region of the x-z plane, described
+by a bounding box, and rays bounce from element to element in whatever order
+their paths dictate.  This makes it possible to model stray-light baffles,
+beads scattered in both x and z, folded paths, etc.
+
+The next element a ray hits is found using a bounding volume hierarchy (BVH)
+over the element bounding boxes, so the cost of each bounce grows
+logarithmically with the number of elements in the scene.
+"""
+
+import math
+
+from base import Simulation, Detector, AbsorbedRay, TrappedRay
+import util
+
+# rays must travel at least this far before they can hit another surface; this
+# keeps rays from immediately re-hitting the surface they just left
+EPSILON = 1e-9
+
+
+class BoundingBox(object):
+    """An axis-aligned rectangle in the x-z plane."""
+
+    def __init__(self, z_min, x_min, z_max, x_max):
+        self.z_min = z_min
+        self.x_min = x_min
+        self.z_max = z_max
+        self.x_max = x_max
+
+    def union(self, other):
+        return BoundingBox(
+                min(self.z_min, other.z_min), min(self.x_min, other.x_min),
+                max(self.z_max, other.z_max), max(self.x_max, other.x_max))
+
+    def center(self):
+        return (self.z_min + self.z_max)/2.0, (self.x_min + self.x_max)/2.0
+
+    def entry(self, z, x, kz, kx):
+        """
+        Return the distance along the ray at which it enters the box, or None
+        if the ray misses the box.  Rays starting inside the box enter it at a
+        distance of zero.
+        """
+        t_enter = 0.0
+        t_exit = float('inf')
+        for p, k, lo, hi in ((z, kz, self.z_min, self.z_max),
+                             (x, kx, self.x_min, self.x_max)):
+            if k == 0:
+                if p < lo or p > hi:
+                    return None
+                continue
+            t0 = (lo - p)/k
+            t1 = (hi - p)/k
+            if t0 > t1:
+                t0, t1 = t1, t0
+            t_enter = max(t_enter, t0)
+            t_exit = min(t_exit, t1)
+            if t_enter > t_exit:
+                return None
+        return t_enter
+
+
+class SceneElement(object):
+    """
+    An abstract class representing an element of a non-sequential scene.
+
+    Unlike optical elements, scene elements do not fill a segment of the
+    z-axis, and may be placed anywhere in the x-z plane (including
+    side-by-side or overlapping one another).
+
+    Scene elements must implement a "bounds" method, which returns a
+    BoundingBox that encloses the element.
+
+    Scene elements must implement an "intersect" method, which takes a ray and
+    its direction vector (kz, kx) and returns the distance along the ray to
+    the first point where it hits the element, or None if it misses.  Hits
+    closer than EPSILON must be ignored.
+
+    Scene elements must implement an "interact" method, which is called once
+    the ray has been moved to the hit point, and adjusts the ray accordingly
+    (for example, by reflecting it).  Like OpticalElement.propagate, it may
+    raise a PropagationException to stop the ray.
+    """
+
+    def bounds(self):
+        raise NotImplementedError
+
+    def intersect(self, ray, kz, kx):
+        raise NotImplementedError
+
+    def interact(self, ray, kz, kx):
+        raise NotImplementedError
+
+
+class Segment(SceneElement):
+    """An abstract scene element which is a line segment from (z1, x1) to (z2, x2)."""
+
+    def __init__(self, z1, x1, z2, x2):
+        self.z1 = z1
+        self.x1 = x1
+        self.z2 = z2
+        self.x2 = x2
+
+        length = math.hypot(z2 - z1, x2 - x1)
+        if length == 0:
+            raise ValueError("Segment must have a non-zero length.")
+        self.nz = -(x2 - x1)/length
+        self.nx = (z2 - z1)/length
+
+    def bounds(self):
+        return BoundingBox(min(self.z1, self.z2), min(self.x1, self.x2),
+                           max(self.z1, self.z2), max(self.x1, self.x2))
+
+    def intersect(self, ray, kz, kx):
+        ez = self.z2 - self.z1
+        ex = self.x2 - self.x1
+        denominator = kz*ex - kx*ez
+        if denominator == 0:
+            return None
+
+        wz = self.z1 - ray.z
+        wx = self.x1 - ray.x
+        t = (wz*ex - wx*ez)/denominator
+        u = (wz*kx - wx*kz)/denominator
+        if t > EPSILON and 0 <= u <= 1:
+            return t
+        return None
+
+
+class Baffle(Segment):
+    """A segment which absorbs every ray that hits it."""
+
+    def interact(self, ray, kz, kx):
+        ray.save()
+        raise AbsorbedRay(ray)
+
+
+class Mirror(Segment):
+    """A segment which reflects rays off of both of its sides."""
+
+    def interact(self, ray, kz, kx):
+        ray.set_direction(*util.reflect(kz, kx, self.nz, self.nx))
+        ray.save()
+
+
+class Sensor(Segment):
+    """
+    A segment which passes every ray that hits it to a detector, and then
+    absorbs it.
+    """
+
+    def __init__(self, z1, x1, z2, x2, detector):
+        super(Sensor, self).__init__(z1, x1, z2, x2)
+        self.detector = detector
+
+    def interact(self, ray, kz, kx):
+        ray.save()
+        self.detector.detect(ray)
+        raise AbsorbedRay(ray)
+
+
+class SceneBead(SceneElement):
+    """
+    A circular bead centered at (z, x), which refracts rays at its surface.
+
+    Rays which are totally internally reflected stay inside the bead.
+    """
+
+    def __init__(self, radius, z, x, n_bead, n_surround=1.0):
+        self.radius = radius
+        self.z = z
+        self.x = x
+        self.n_bead = n_bead
+        self.n_surround = n_surround
+
+    def bounds(self):
+        r = self.radius
+        return BoundingBox(self.z - r, self.x - r, self.z + r, self.x + r)
+
+    def intersect(self, ray, kz, kx):
+        oz = ray.z - self.z
+        ox = ray.x - self.x
+        b = oz*kz + ox*kx
+        c = oz**2 + ox**2 - self.radius**2
+        discriminant = b**2 - c
+        if discriminant <= 0:
+            return None
+
+        root = math.sqrt(discriminant)
+        for t in (-b - root, -b + root):
+            if t > EPSILON:
+                return t
+        return None
+
+    def interact(self, ray, kz, kx):
+        nz = (ray.z - self.z)/self.radius
+        nx = (ray.x - self.x)/self.radius
+        if kz*nz + kx*nx < 0:
+            eta = self.n_surround/self.n_bead
+        else:
+            eta = self.n_bead/self.n_surround
+            nz, nx = -nz, -nx
+
+        ray.set_direction(*util.refract(kz, kx, nz, nx, eta))
+        ray.save()
+
+
+class BVHNode(object):
+
+    def __init__(self, box, elements=None, left=None, right=None):
+        self.box = box
+        self.elements = elements
+        self.left = left
+        self.right = right
+
+
+class BVH(object):
+    """
+    A bounding volume hierarchy over a list of scene elements.
+
+    The hierarchy is built top-down, splitting the elements at the median of
+    their bounding box centers along the longest axis, until each leaf holds at
+    most "leaf_size" elements.
+    """
+
+    def __init__(self, elements, leaf_size=2):
+        self.leaf_size = leaf_size
+        items = [(e, e.bounds()) for e in elements]
+        self.root = self.build(items) if items else None
+
+    def build(self, items):
+        box = items[0][1]
+        for _, b in items[1:]:
+            box = box.union(b)
+
+        if len(items) <= self.leaf_size:
+            return BVHNode(box, elements=items)
+
+        centers = [b.center() for _, b in items]
+        z_span = max(c[0] for c in centers) - min(c[0] for c in centers)
+        x_span = max(c[1] for c in centers) - min(c[1] for c in centers)
+        axis = 0 if z_span >= x_span else 1
+
+        items = sorted(items, key=lambda item: item[1].center()[axis])
+        middle = len(items)//2
+        return BVHNode(box, left=self.build(items[:middle]),
+                       right=self.build(items[middle:]))
+
+    def nearest(self, ray, kz, kx):
+        """
+        Return (distance, element) for the first element hit by the ray, or
+        None if the ray doesn't hit any element.
+        """
+        if self.root is None:
+            return None
+        t_root = self.root.box.entry(ray.z, ray.x, kz, kx)
+        if t_root is None:
+            return None
+
+        # children are tested when their parent is expanded, and the nearer
+        # one is visited first, so that boxes beyond the closest hit found so
+        # far are skipped without being opened
+        best_t = float('inf')
+        best_element = None
+        stack = [(t_root, self.root)]
+        while stack:
+            t_box, node = stack.pop()
+            if t_box > best_t:
+                continue
+
+            if node.elements is not None:
+                for element, box in node.elements:
+                    t = element.intersect(ray, kz, kx)
+                    if t is not None and t < best_t:
+                        best_t = t
+                        best_element = element
+                continue
+
+            t_left = node.left.box.entry(ray.z, ray.x, kz, kx)
+            t_right = node.right.box.entry(ray.z, ray.x, kz, kx)
+            if t_left is None:
+                if t_right is not None:
+                    stack.append((t_right, node.right))
+            elif t_right is None:
+                stack.append((t_left, node.left))
+            elif t_left <= t_right:
+                stack.append((t_right, node.right))
+                stack.append((t_left, node.left))
+            else:
+                stack.append((t_left, node.left))
+                stack.append((t_right, node.right))
+
+        if best_element is None:
+            return None
+        return best_t, best_element
+
+
+class Scene(Simulation):
+    """
+    A non-sequential simulation.
+
+    The setup is a list of scene elements and detectors.  Rays bounce between
+    the scene elements until they are absorbed or leave the scene; rays that
+    leave the scene are passed to every detector in the setup.  Rays that
+    bounce more than "max_bounces" times are considered trapped.
+
+    Rays in a scene each follow their own path, so sources with multiple
+    wavelengths are not supported.
+    """
+
+    def __init__(self, source, setup, max_bounces=1000, symmetric=False):
+        super(Scene, self).__init__(source, setup, symmetric)
+        self.max_bounces = max_bounces
+        self.bvh = None
+
+    @property
+    def scene_elements(self):
+        return [obj for obj in self.setup if isinstance(obj, SceneElement)]
+
+    @property
+    def detectors(self):
+        detectors = [obj for obj in self.setup if isinstance(obj, Detector)]
+        for obj in self.setup:
+            if isinstance(obj, Sensor) and obj.detector not in detectors:
+                detectors.append(obj.detector)
+        return detectors
+
+    def pre_process(self):
+        if getattr(self.source, 'wavelengths', None) is not None:
+            raise ValueError("Scenes do not support sources with wavelengths.")
+        super(Scene, self).pre_process()
+        self.bvh = BVH(self.scene_elements)
+
+    def trace(self, ray):
+        for bounce in range(self.max_bounces):
+            kz, kx = ray.direction
+            hit = self.bvh.nearest(ray, kz, kx)
+            if hit is None:
+                for obj in self.setup:
+                    if isinstance(obj, Detector):
+                        obj.detect(ray)
+                return
+
+            t, element = hit
+            ray.z += t*kz
+            ray.x += t*kx
+            element.interact(ray, kz, kx)
+        raise TrappedRay(ray)
@@ -6,23 +6,33 @@ from base import *
 import util
 
 class Trace(Ray):
+    """A ray which remembers its locations, and its amplitude at each of them."""
 
     def __init__(self, *args, **kwargs):
         super(Trace, self).__init__(*args, **kwargs)
         self.locations = [(self.x, self.z)]
+        self.amplitudes = [self.a]
 
     def save(self):
         self.locations.append((self.x, self.z))
+        self.amplitudes.append(self.a)
 
 
 class Space(OpticalElement):
 
+    symmetric = True
+
     def __init__(self, distance):
         self.distance = distance
 
     def propagate(self, ray):
-        ray.z += self.distance
-        ray.x = ray.x + math.tan(ray.th)*self.distance
+        distance = self.distance
+        ray.z += distance
+        try:
+            ray.x = ray.x + math.tan(ray.th)*distance
+        except TypeError:
+            # rays with wavelengths hold an array of angles
+            ray.x = ray.x + np.tan(ray.th)*distance
         ray.save()
 
     def dz(self):
@@ -31,6 +41,8 @@ class Space(OpticalElement):
 
 class ParaxialSpace(OpticalElement):
 
+    symmetric = True
+
     def __init__(self, distance):
         self.distance = distance
 
@@ -39,12 +51,17 @@ class ParaxialSpace(OpticalElement):
         ray.x = ray.x + ray.th*self.distance
         ray.save()
 
+    def transfer_matrix(self):
+        return ((1.0, self.distance), (0.0, 1.0))
+
     def dz(self):
         return self.distance
 
 
 class ParaxialLens(OpticalElement):
 
+    symmetric = True
+
     def __init__(self, f):
         if f == 0:
             raise ValueError("Can not have a focal length of zero.")
@@ -54,6 +71,9 @@ class ParaxialLens(OpticalElement):
         ray.th = ray.th - ray.x/self.f
         ray.save()
 
+    def transfer_matrix(self):
+        return ((1.0, 0.0), (-1.0/self.f, 1.0))
+
     def dz(self):
         return 0.0
 
@@ -69,11 +89,29 @@ class Aperture(OpticalElement):
             self.left = args[0]
             self.right = args[1]
 
+    @property
+    def symmetric(self):
+        return self.left == -self.right
+
     def propagate(self, ray):
-        if ray.x < self.left or ray.x > self.right:
+        if ray.wavelength is None:
+            if ray.x < self.left or ray.x > self.right:
+                ray.save()
+                raise AbsorbedRay(ray)
+            return
+
+        blocked = (ray.x < self.left) | (ray.x > self.right)
+        if np.all(blocked):
             ray.save()
             raise AbsorbedRay(ray)
+        if np.any(blocked):
+            ray.a = np.where(blocked, 0.0, ray.a)
 
+    def transfer_matrix(self):
+        return ((1.0, 0.0), (0.0, 1.0))
+
+    def limits(self):
+        return self.left, self.right
 
     def dz(self):
         return 0.0
@@ -101,7 +139,7 @@ class ConcreteSource(Source):
         th = self.th[self.count]
         a = self.a[self.count]
 
-        ray = self.Ray(x, th, a=a)
+        ray = self.create_ray(x, th, a)
 
         self.count += 1
         return ray
@@ -124,13 +162,17 @@ class AngleSpanSource(Source):
         self.dth = self.th_span/(self.num_rays - 1)
         self.count = 0
 
+    @property
+    def symmetric(self):
+        return self.x == 0
+
     def next(self):
         if self.count >= self.num_rays:
             raise StopIteration()
 
         x = self.x
         th = self.count*self.dth - self.th_span/2.0
-        ray = self.Ray(x, th)
+        ray = self.create_ray(x, th)
 
         self.count += 1
         return ray
@@ -148,13 +190,17 @@ class PositionSpanSource(Source):
         self.dx = abs(self.x_stop - self.x_start)/(self.num_rays - 1)
         self.count = 0
 
+    @property
+    def symmetric(self):
+        return self.x_start == -self.x_stop and self.th == 0
+
     def next(self):
         if self.count >= self.num_rays:
             raise StopIteration()
 
         x = self.count*self.dx + self.x_start
         th = self.th
-        ray = self.Ray(x, th)
+        ray = self.create_ray(x, th)
 
         self.count += 1
         return ray 
@@ -173,7 +219,7 @@ class RandomSource(Source):
             raise StopIteration()
 
         x, th = self.distribution()
-        ray = self.Ray(x, th)
+        ray = self.create_ray(x, th)
 
         self.count += 1
         return ray
@@ -194,42 +240,91 @@ class RayDetector(Detector):
         return report
 
 
-class PositionDetector(Detector):
+class SpectralDetector(Detector):
+    """
+    An abstract detector whose data gains a trailing axis, with one entry per
+    wavelength, when it is given the wavelengths of the rays it detects.
+    """
 
-    def __init__(self, name, x_bins):
+    def __init__(self, name, wavelengths=None):
         self.name = name
+        if wavelengths is None:
+            self.wavelengths = None
+            self.channels = ()
+        else:
+            self.wavelengths = np.asarray(wavelengths, dtype=float)
+            self.channels = (np.arange(len(self.wavelengths)),)
+
+    def check_wavelengths(self, wavelengths):
+        if wavelengths is None and self.wavelengths is None:
+            return
+        if (wavelengths is None or self.wavelengths is None
+                or not np.array_equal(wavelengths, self.wavelengths)):
+            raise ValueError("Detector '{}' must be given the same wavelengths "
+                             "as the source.".format(self.name))
+
+    def data_shape(self, *shape):
+        if self.wavelengths is None:
+            return shape
+        return shape + (len(self.wavelengths),)
+
+    def report(self):
+        report = {}
+        if self.wavelengths is not None:
+            report['wavelengths'] = self.wavelengths
+        return report
+
+
+class PositionDetector(SpectralDetector):
+
+    def __init__(self, name, x_bins, wavelengths=None):
+        super(PositionDetector, self).__init__(name, wavelengths)
         self.x_bins = np.array(x_bins)
-        self.data = np.zeros(len(self.x_bins) + 1)
+        self.data = np.zeros(self.data_shape(len(self.x_bins) + 1))
+
+    @property
+    def symmetric(self):
+        return util.is_symmetric(self.x_bins)
 
     def detect(self, ray):
         x_bin = util.digitize(ray.x, self.x_bins)
-        self.data[x_bin] += ray.a
+        self.data[(x_bin,) + self.channels] += ray.a
+
+    def mirror(self):
+        self.data = self.data + self.data[::-1]
 
     def report(self):
-        report = {}
+        report = super(PositionDetector, self).report()
         report['x_bins'] = self.x_bins
         report['data'] = self.data
         return report
 
 
-class PositionAngleDetector(Detector):
+class PositionAngleDetector(SpectralDetector):
 
-    def __init__(self, name, x_bins, th_bins=100):
-        self.name = name
+    def __init__(self, name, x_bins, th_bins=100, wavelengths=None):
+        super(PositionAngleDetector, self).__init__(name, wavelengths)
         self.x_bins = np.array(x_bins)
         if type(th_bins) == int:
             self.th_bins = np.linspace(-math.pi/2.0, math.pi/2.0, th_bins)
         else:
             self.th_bins = np.array(th_bins)
-        self.data= np.zeros([len(self.x_bins) + 1, len(self.th_bins) + 1])
+        self.data= np.zeros(self.data_shape(len(self.x_bins) + 1, len(self.th_bins) + 1))
+
+    @property
+    def symmetric(self):
+        return util.is_symmetric(self.x_bins) and util.is_symmetric(self.th_bins)
 
     def detect(self, ray):
         x_bin = util.digitize(ray.x, self.x_bins)
         th_bin = util.digitize(ray.th, self.th_bins)
-        self.data[x_bin, th_bin] += ray.a
+        self.data[(x_bin, th_bin) + self.channels] += ray.a
+
+    def mirror(self):
+        self.data = self.data + self.data[::-1, ::-1]
 
     def report(self):
-        report = {}
+        report = super(PositionAngleDetector, self).report()
         report['x_bins'] = self.x_bins
         report['th_bins'] = self.th_bins
         report['data'] = self.data
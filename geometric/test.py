@@ -1,13 +1,18 @@
 import unittest
 import math
 import pdb
+import os
+import subprocess
+import sys
 
 from pylab import *
 
 from base import *
 from standard import *
 from extra import *
-from visualization import plot_traces
+import extra
+from scene import *
+from visualization import plot_traces, render_traces, trace_segments
 
 
 PLOTTING = False
@@ -110,7 +115,6 @@ class Imaging(unittest.TestCase):
         show()
 
 
-@unittest.skip("Not done implimenting")
 class BeadTest(unittest.TestCase):
 
     def setUp(self):
@@ -164,20 +168,23 @@ class BeadTest(unittest.TestCase):
         x_i = offset
         z_i = self.pre_space + a - np.sqrt(a**2 - offset**2)
 
-        th_i = atan(x_i/a)
-        th_r = atan(bead.n_surround/bead.n_bead*sin(th_i))
+        th_i = math.asin(x_i/a)
+        th_r = math.asin(bead.n_surround/bead.n_bead*sin(th_i))
         pathlength_in_bead = 2*a*cos(th_r)
 
         beta = th_i - th_r
         x_e = x_i - pathlength_in_bead*sin(beta)
         z_e = z_i + pathlength_in_bead*cos(beta)
 
+        z_f = self.pre_space + 2*a
+        x_f = x_e - math.tan(2*beta)*(z_f - z_e)
+
         x_theoretical = array([
             offset, # starting place
             offset, # hit first plane of the bead object
             x_i,    # interset bead
             x_e,    # exit bead
-                    # should add the last one here once I calculate it
+            x_f,    # exit plane of the bead object
         ])
 
         z_theoretical = array([
@@ -185,6 +192,7 @@ class BeadTest(unittest.TestCase):
             self.pre_space,
             z_i,
             z_e,
+            z_f,
         ])
 
         report = simulation.run()
@@ -197,11 +205,39 @@ class BeadTest(unittest.TestCase):
             plot(z_theoretical, x_theoretical, 'r')
             show()
 
-        self.assertEqual(locations[0], (x_theoretical[0], z_theoretical[0]))
-        self.assertEqual(locations[1], (x_theoretical[1], z_theoretical[1]))
-        self.assertEqual(locations[2], (x_theoretical[2], z_theoretical[2]))
-        self.assertEqual(locations[3], (x_theoretical[3], z_theoretical[3]))
-
+        for i in range(len(x_theoretical)):
+            self.assertAlmostEqual(locations[i][0], x_theoretical[i])
+            self.assertAlmostEqual(locations[i][1], z_theoretical[i])
+
+        th_f = report['rays']['rays'][0].th
+        self.assertAlmostEqual(th_f, -2*beta)
+
+
+    def test_bubble_reflects(self):
+        # a ray grazing a bubble is totally internally reflected at its surface
+        bubble = Bead(1.0, 0.0, 1.0, n_surround=1.5)
+        ray = Trace(0.95, 0.0)
+        bubble.z_front = 0.0
+        bubble.propagate(ray)
+
+        z = [loc[1] for loc in ray.locations]
+        self.assertEqual(z, sorted(z))
+        self.assertAlmostEqual(z[-1], 2.0)
+        self.assertTrue(ray.x > 0.95)
+        self.assertTrue(ray.th > 0)
+        x, th = ray.x, ray.th
+
+        # the same, with one wavelength passing into the bubble
+        n_bubble = lambda wavelength: select(wavelength > 500e-9, 1.0, 1.49)
+        bubble = Bead(1.0, 0.0, n_bubble, n_surround=1.5)
+        ray = Trace(array([0.95, 0.95]), array([0.0, 0.0]),
+                    wavelength=array([450e-9, 650e-9]))
+        bubble.z_front = 0.0
+        bubble.propagate(ray)
+        self.assertAlmostEqual(ray.z, 2.0)
+        self.assertAlmostEqual(ray.x[1], x)
+        self.assertAlmostEqual(ray.th[1], th)
+        self.assertNotAlmostEqual(ray.x[0], x)
 
     @unittest.skipIf(not PLOTTING, 'not plotting')
     def test_tracing(self):
@@ -214,6 +250,156 @@ class BeadTest(unittest.TestCase):
         axis('equal')
         show()
 
+class BeadTableTest(unittest.TestCase):
+
+    def trace(self, tabulated, source=None, n_bead=1.3, n_surround=1.0):
+        if source is None:
+            source = AngleSpanSource(201, x=0.3, th_span=0.6)
+        setup = [
+            Space(0.1),
+            Bead(1.0, 0.0, n_bead, n_surround, tabulated=tabulated),
+            Space(1.0),
+            RayDetector('rays'),
+        ]
+        report = Simulation(source, setup).run()
+        return report['rays']['rays']
+
+    def test_error_bound(self):
+        table = BeadTable(1.3, tolerance=1e-6)
+        self.assertTrue(table.error <= 1e-6)
+
+        incidence = linspace(-1.5, 1.5, 1001)
+        exit_angle, deviation = table.solve(incidence)
+        table_exit_angle, table_deviation = table.lookup(np.sin(incidence))
+        self.assertTrue(max(abs(exit_angle - table_exit_angle)) <= table.error)
+        self.assertTrue(max(abs(deviation - table_deviation)) <= table.error)
+
+    def test_matches_exact(self):
+        exact = self.trace(False)
+        tabulated = self.trace(True)
+        self.assertEqual(len(exact), len(tabulated))
+        for e, t in zip(exact, tabulated):
+            self.assertAlmostEqual(e.x, t.x, places=5)
+            self.assertAlmostEqual(e.th, t.th, places=5)
+            self.assertEqual(e.z, t.z)
+
+    def test_bubble_matches_exact(self):
+        # rays beyond s = 1/1.5 are totally internally reflected at entry
+        trace = lambda tabulated: self.trace(tabulated, PositionSpanSource(200, -0.95, 0.95),
+                                             n_bead=1.0, n_surround=1.5)
+        exact = trace(False)
+        tabulated = trace(True)
+        # some reflected rays head backwards and escape
+        self.assertEqual(len(exact), len(tabulated))
+        self.assertTrue(len(exact) > 150)
+        for e, t in zip(exact, tabulated):
+            # nearly sideways rays magnify the error of the table in x
+            self.assertAlmostEqual(e.x, t.x, delta=1e-5*max(1, abs(e.x)))
+            self.assertAlmostEqual(e.th, t.th, places=5)
+
+    def test_tolerance_enforced(self):
+        table = BeadTable(1.3, tolerance=1e-9, min_step=1e-3)
+        self.assertTrue(table.error > 1e-9)
+        key = (1.3, 1.0, 1e-9)
+        extra._bead_tables[key] = table
+        try:
+            self.assertRaises(ValueError, Bead, 1.0, 0.0, 1.3, tabulated=True, tolerance=1e-9)
+        finally:
+            del extra._bead_tables[key]
+
+    def test_cached(self):
+        first = Bead(1.0, 0.0, 1.3, tabulated=True)
+        second = Bead(2.0, 1.0, 1.3, tabulated=True)
+        self.assertTrue(first.table is second.table)
+        self.assertTrue(Bead(1.0, 0.0, 1.5, tabulated=True).table is not first.table)
+
+
+class SpectralTest(unittest.TestCase):
+
+    def setUp(self):
+        self.wavelengths = [450e-9, 550e-9, 650e-9]
+        self.n_bead = lambda wavelength: 1.5 + 3e-14/wavelength**2
+
+        self.x_bins = linspace(-0.5, 0.5, 21)
+        self.th_bins = linspace(-1, 1, 41)
+
+    def run_simulation(self, wavelengths, n_bead):
+        source = PositionSpanSource(21, -0.4, 0.4, wavelengths=wavelengths)
+        setup = [
+            Space(0.1),
+            Aperture(-0.3, 0.5),
+            Bead(0.5, 0.0, n_bead),
+            Space(0.2),
+            PositionAngleDetector('camera', self.x_bins, self.th_bins,
+                                  wavelengths=wavelengths),
+        ]
+        return Simulation(source, setup).run()['camera']
+
+    def test_matches_single_wavelength(self):
+        spectral = self.run_simulation(self.wavelengths, self.n_bead)
+        self.assertEqual(spectral['data'].shape, (22, 42, 3))
+        self.assertEqual(list(spectral['wavelengths']), self.wavelengths)
+
+        for i, wavelength in enumerate(self.wavelengths):
+            single = self.run_simulation(None, self.n_bead(wavelength))
+            self.assertTrue(allclose(spectral['data'][:, :, i], single['data']))
+
+    def test_dispersion(self):
+        data = self.run_simulation(self.wavelengths, self.n_bead)['data']
+        self.assertFalse(allclose(data[:, :, 0], data[:, :, 2]))
+
+    def test_partial_absorption(self):
+        wavelength = array([500e-9, 600e-9])
+        ray = Ray(array([0.0, 0.5]), array([0.0, 0.0]), a=array([1.0, 1.0]),
+                  wavelength=wavelength)
+        Aperture(0.2).propagate(ray)
+        self.assertEqual(list(ray.a), [1.0, 0.0])
+
+        ray = Ray(array([0.3, 0.5]), array([0.0, 0.0]), a=array([1.0, 1.0]),
+                  wavelength=wavelength)
+        self.assertRaises(AbsorbedRay, Aperture(0.2).propagate, ray)
+
+    def test_detector_wavelength_mismatch(self):
+        def run(source_wavelengths, detector_wavelengths):
+            source = PositionSpanSource(11, -0.4, 0.4, wavelengths=source_wavelengths)
+            setup = [Space(1.0), PositionDetector('camera', self.x_bins,
+                                                  wavelengths=detector_wavelengths)]
+            return Simulation(source, setup).run()
+
+        self.assertRaises(ValueError, run, self.wavelengths, None)
+        self.assertRaises(ValueError, run, None, self.wavelengths)
+        self.assertRaises(ValueError, run, self.wavelengths, self.wavelengths[:2])
+
+        data = run(self.wavelengths, self.wavelengths)['camera']['data']
+        self.assertEqual(data.sum(), 33.0)
+
+    def test_dispersive_requires_wavelength(self):
+        simulation = Simulation(SingleRaySource(0.1, 0.0), [Bead(0.5, 0.0, self.n_bead)])
+        self.assertRaises(ValueError, simulation.run)
+
+
+class RayDirectionTest(unittest.TestCase):
+
+    def test_direction_follows_angle(self):
+        ray = Ray(x=0, th=0.3)
+        self.assertAlmostEqual(ray.direction[0], math.cos(0.3))
+        self.assertAlmostEqual(ray.direction[1], math.sin(0.3))
+
+        ray.th = -0.2
+        self.assertAlmostEqual(ray.direction[1], math.sin(-0.2))
+
+    def test_set_direction(self):
+        ray = Ray(x=0, th=0)
+        ray.set_direction(math.cos(0.4), math.sin(0.4))
+        self.assertAlmostEqual(ray.th, 0.4)
+
+    def test_space(self):
+        ray = Ray(x=0, th=math.pi/4)
+        Space(2.0).propagate(ray)
+        self.assertAlmostEqual(ray.x, 2.0)
+        self.assertEqual(ray.z, 2.0)
+
+
 class ApertureTest(unittest.TestCase):
 
     def setUp(self):
@@ -226,5 +412,305 @@ class ApertureTest(unittest.TestCase):
         self.assertRaises(AbsorbedRay, self.offset_aperture.propagate, ray)
 
 
+class SymmetryTest(unittest.TestCase):
+
+    def make_simulation(self, source, symmetric):
+        setup = [
+            Space(0.5),
+            Aperture(0.2),
+            ParaxialLens(1.0),
+            Space(1.0),
+            PositionDetector('camera', linspace(-0.5, 0.5, 20)),
+            PositionAngleDetector('pupil', linspace(-0.5, 0.5, 20), 50),
+        ]
+        return Simulation(source, setup, symmetric=symmetric)
+
+    def test_detected(self):
+        simulation = self.make_simulation(AngleSpanSource(101, th_span=1.0), 'auto')
+        simulation.pre_process()
+        self.assertTrue(simulation.use_symmetry)
+
+        simulation.setup.append(RayDetector('rays'))
+        simulation.pre_process()
+        self.assertFalse(simulation.use_symmetry)
+
+        simulation = self.make_simulation(AngleSpanSource(101, x=0.1), 'auto')
+        simulation.pre_process()
+        self.assertFalse(simulation.use_symmetry)
+
+        # rays at x = 0 all go through the lower lens, so it isn't symmetric
+        simulation = self.make_simulation(AngleSpanSource(101, th_span=1.0), 'auto')
+        simulation.setup.insert(1, PartionedApertureLens(1.0, 0.1))
+        simulation.pre_process()
+        self.assertFalse(simulation.use_symmetry)
+
+    def test_matches_full_trace(self):
+        for source in [AngleSpanSource, lambda n: PositionSpanSource(n, -0.3, 0.3)]:
+            full = self.make_simulation(source(101), False).run()
+            half = self.make_simulation(source(101), 'auto').run()
+            for name in ['camera', 'pupil']:
+                self.assertTrue(allclose(full[name]['data'], half[name]['data']))
+                self.assertAlmostEqual(half[name]['data'].sum(), full[name]['data'].sum())
+
+    def test_bin_edge_at_zero(self):
+        # the 4f setup from Imaging, which focuses every ray onto x = 0
+        def make_simulation():
+            setup = [
+                ParaxialSpace(1.0),
+                ParaxialLens(1.0),
+                ParaxialSpace(2.0),
+                ParaxialLens(1.0),
+                ParaxialSpace(1.0),
+                PositionAngleDetector('camera', linspace(-0.3, 0.3, 101)),
+            ]
+            return Simulation(AngleSpanSource(1001, th_span=pi/2), setup, symmetric='auto')
+
+        simulation = make_simulation()
+        simulation.pre_process()
+        self.assertFalse(simulation.use_symmetry)
+
+        data = make_simulation().run()['camera']['data']
+        self.assertEqual(data[51].sum(), 1001)
+
+    def test_declared_requires_symmetric_detectors(self):
+        simulation = Simulation(AngleSpanSource(5), [RayDetector('rays')], symmetric=True)
+        self.assertRaises(ValueError, simulation.run)
+
+
+class PrefilterTest(unittest.TestCase):
+
+    def make_simulation(self, prefilter):
+        x, th = meshgrid(linspace(-1, 1, 41), linspace(-0.5, 0.5, 41))
+        source = ConcreteSource(x.ravel(), th.ravel())
+        setup = [
+            ParaxialSpace(0.5),
+            Aperture(0.4),
+            ParaxialLens(1.0),
+            ParaxialSpace(1.0),
+            Aperture(-0.1, 0.3),
+            ParaxialSpace(0.5),
+            PositionDetector('camera', linspace(-1, 1, 21)),
+            Aperture(0.05),
+        ]
+        simulation = Simulation(source, setup, prefilter=prefilter)
+        simulation.absorbed = []
+        simulation.handle_absorbed_ray = simulation.absorbed.append
+        return simulation
+
+    def test_acceptance_region(self):
+        region = AcceptanceRegion(self.make_simulation(True).setup)
+        self.assertEqual(len(region.constraints), 2)
+        self.assertTrue(region.accepts(0.0, 0.0))
+        self.assertFalse(region.accepts(0.0, 0.7))
+        self.assertFalse(region.accepts(-0.2, -0.3))
+
+    def test_matches_unfiltered(self):
+        unfiltered = self.make_simulation(False)
+        filtered = self.make_simulation(True)
+        unfiltered_report = unfiltered.run()
+        filtered_report = filtered.run()
+
+        self.assertTrue(array_equal(unfiltered_report['camera']['data'],
+                                    filtered_report['camera']['data']))
+        self.assertEqual(len(unfiltered.absorbed), len(filtered.absorbed))
+        self.assertTrue(filtered.num_rejected > 0)
+        self.assertEqual(unfiltered.num_rejected, 0)
+
+    def test_stops_at_non_paraxial_element(self):
+        setup = [Aperture(0.1), Space(1.0), Aperture(0.1)]
+        self.assertEqual(len(AcceptanceRegion(setup).constraints), 1)
+
+
+class SceneTest(unittest.TestCase):
+
+    def test_folded_path(self):
+        # a 45 degree mirror folds the ray onto a sensor above the z-axis
+        setup = [
+            Mirror(1.0, -0.5, 2.0, 0.5),
+            Sensor(0.0, 2.0, 3.0, 2.0, RayDetector('rays')),
+            Baffle(3.0, -1.0, 3.0, 1.0),
+        ]
+        source = SingleRaySource(0.0, 0.0, Ray=Trace)
+        report = Scene(source, setup).run()
+
+        rays = report['rays']['rays']
+        self.assertEqual(len(rays), 1)
+        x, z = rays[0].locations[-1]
+        self.assertAlmostEqual(x, 2.0)
+        self.assertAlmostEqual(z, 1.5)
+
+    def test_nearest_matches_brute_force(self):
+        beads = []
+        for i in range(10):
+            for j in range(10):
+                beads.append(SceneBead(0.3, 1.0 + i, -5.0 + j, 1.5))
+        bvh = BVH(beads)
+
+        for th in linspace(-0.5, 0.5, 21):
+            ray = Ray(0.1, th)
+            kz, kx = cos(th), sin(th)
+            hits = [(b.intersect(ray, kz, kx), b) for b in beads]
+            hits = [h for h in hits if h[0] is not None]
+            nearest = bvh.nearest(ray, kz, kx)
+            if hits:
+                self.assertEqual(nearest, min(hits))
+            else:
+                self.assertEqual(nearest, None)
+
+    def test_nearest_prunes(self):
+        class CountingBead(SceneBead):
+            calls = 0
+            def intersect(self, ray, kz, kx):
+                CountingBead.calls += 1
+                return SceneBead.intersect(self, ray, kz, kx)
+
+        beads = [CountingBead(0.3, 1.0*i, 1.0*j, 1.5) for i in range(64) for j in range(64)]
+        bvh = BVH(beads)
+
+        # rays along a row of beads, in both directions, and along a diagonal
+        for z, x, th in [(-1.0, 20.0, 0.0), (70.0, 20.0, pi), (-1.0, -1.0, pi/4)]:
+            CountingBead.calls = 0
+            ray = Ray(x, th, z=z)
+            t, bead = bvh.nearest(ray, cos(th), sin(th))
+            # one leaf of two beads, out of 4096
+            self.assertTrue(CountingBead.calls <= 4)
+
+    def test_bead_focuses(self):
+        # paraxial rays through a ball lens cross the axis behind it
+        detector = RayDetector('rays')
+        setup = [SceneBead(1.0, 2.0, 0.0, 1.5), detector]
+        source = PositionSpanSource(3, -0.1, 0.1)
+        Scene(source, setup).run()
+
+        top = detector.rays[2]
+        self.assertTrue(top.th < 0)
+        self.assertAlmostEqual(detector.rays[1].th, 0.0)
+        self.assertAlmostEqual(top.th, -detector.rays[0].th)
+
+    def test_trapped(self):
+        setup = [Mirror(1.0, -1.0, 1.0, 1.0), Mirror(-1.0, -1.0, -1.0, 1.0)]
+        source = SingleRaySource(0.0, 0.0)
+        simulation = Scene(source, setup, max_bounces=10)
+        trapped = []
+        simulation.handle_trapped_ray = trapped.append
+        simulation.run()
+        self.assertEqual(len(trapped), 1)
+
+
+class RenderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.traces = []
+        for x in [0.25, 0.55]:
+            trace = Trace(x, 0.0, a=2.0)
+            trace.x, trace.z = x, 0.5
+            trace.save()
+            trace.x, trace.z = x, 1.0
+            trace.save()
+            self.traces.append(trace)
+
+    def test_segments(self):
+        segments, weights = trace_segments(self.traces)
+        self.assertEqual(segments.shape, (4, 2, 2))
+        self.assertEqual(list(weights), [2.0]*4)
+        self.assertEqual(list(segments[1, 1]), [1.0, 0.25])
+
+    def test_render(self):
+        image, extent = render_traces(self.traces, (10, 10), (0, 1, 0, 1))
+
+        # each trace crosses 10 pixels with an amplitude of 2
+        self.assertAlmostEqual(image.sum(), 40.0)
+        self.assertAlmostEqual(image[2].sum(), 20.0)
+        self.assertAlmostEqual(image[5].sum(), 20.0)
+        self.assertTrue(all(image[2] > 0))
+
+    def test_render_clipped(self):
+        # a vertical segment, a segment along the top edge (which falls
+        # outside of the image), and a reversed vertical segment along the
+        # bottom edge
+        trace = Trace(0.0, 0.0)
+        trace.locations = [(0.0, 0.5), (1.0, 0.5), (1.0, 0.0), (0.0, 0.0)]
+        image, extent = render_traces([trace], (10, 10), (0, 1, 0, 1))
+        self.assertAlmostEqual(image.sum(), 20.0)
+        self.assertAlmostEqual(image[:, 5].sum(), 10.0)
+        self.assertAlmostEqual(image[:, 0].sum(), 10.0)
+
+        # a diagonal segment which is only partly inside of the image
+        trace = Trace(-0.5, 0.0)
+        trace.locations = [(-0.5, -0.5), (0.75, 0.75)]
+        image, extent = render_traces([trace], (10, 10), (0, 1, 0, 1))
+        self.assertAlmostEqual(image.sum(), 7.5*sqrt(2))
+        self.assertAlmostEqual(image[7, 7], 0.5*sqrt(2))
+        self.assertEqual(image[8:].sum(), 0.0)
+
+    def test_render_absorbed_channel(self):
+        # the second wavelength is absorbed by the aperture halfway along
+        trace = Trace(array([0.25, 0.95]), array([0.0, 0.0]), wavelength=array([1.0, 2.0]))
+        for element in [Space(0.5), Aperture(0.9), Space(0.5)]:
+            element.propagate(trace)
+
+        passed, extent = render_traces([trace], (10, 10), (0, 1, 0, 1), channel=0)
+        absorbed, extent = render_traces([trace], (10, 10), (0, 1, 0, 1), channel=1)
+        self.assertAlmostEqual(passed.sum(), 10.0)
+        self.assertAlmostEqual(absorbed[9, :5].sum(), 5.0)
+        self.assertEqual(absorbed[9, 5:].sum(), 0.0)
+
+    def test_render_empty(self):
+        single_points = [Trace(0.5, 0.0)]
+        for traces in [[], single_points]:
+            image, extent = render_traces(traces, (10, 20), (0, 1, 0, 1))
+            self.assertEqual(image.shape, (10, 20))
+            self.assertEqual(image.sum(), 0.0)
+            self.assertRaises(ValueError, render_traces, traces)
+
+    def test_render_traced_fan(self):
+        source = AngleSpanSource(101, th_span=0.2, Ray=Trace)
+        setup = [Space(1.0), RayDetector('rays')]
+        report = Simulation(source, setup).run()
+        image, extent = render_traces(report['rays']['rays'], (50, 100))
+        self.assertEqual(image.shape, (50, 100))
+        self.assertAlmostEqual(extent[1], 1.0)
+
+
+    def test_spectral_traces(self):
+        wavelengths = [450e-9, 650e-9]
+        source = PositionSpanSource(5, -0.4, 0.4, wavelengths=wavelengths, Ray=Trace)
+        n_bead = lambda wavelength: 1.5 + 3e-14/wavelength**2
+        setup = [Space(0.1), Bead(0.5, 0.0, n_bead), Space(0.2), RayDetector('rays')]
+        traces = Simulation(source, setup).run()['rays']['rays']
+
+        self.assertRaises(ValueError, trace_segments, traces)
+        self.assertRaises(ValueError, render_traces, traces)
+
+        blue, _ = trace_segments(traces, channel=0)
+        red, _ = trace_segments(traces, channel=1)
+        self.assertEqual(blue.shape, red.shape)
+        self.assertFalse(allclose(blue, red))
+        image, extent = render_traces(traces, (20, 20), channel=1)
+        self.assertTrue(image.sum() > 0)
+
+class ImportTest(unittest.TestCase):
+
+    def run_python(self, statement):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.check_output([sys.executable, '-c', statement], cwd=root)
+
+    def test_lazy_import(self):
+        output = self.run_python('import sys, geometric; '
+                'print("numpy" in sys.modules); print("matplotlib" in sys.modules)')
+        self.assertEqual(output.split(), ['False', 'False'])
+
+    def test_first_use(self):
+        output = self.run_python('import geometric; '
+                'print(geometric.Simulation.__name__); '
+                'print("Scene" in geometric.__all__)')
+        self.assertEqual(output.split(), ['Simulation', 'True'])
+
+    def test_visualization_without_matplotlib(self):
+        output = self.run_python('import sys, geometric.visualization; '
+                'print("matplotlib" in sys.modules)')
+        self.assertEqual(output.split(), ['False'])
+
+
 if __name__ == '__main__':
     unittest.main()
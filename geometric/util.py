@@ -2,13 +2,78 @@ import numpy as np
 from math import pi
 import math
 
+# the helpers below use the math module for these types, since numpy functions
+# are much slower on single values
+SCALARS = (int, float)
+
 def digitize(x, bins):
+    if not isinstance(x, SCALARS) and np.ndim(x):
+        return np.digitize(x, bins)
     inds = np.digitize([x], bins)    
     return inds[0]
 
+def select(condition, x, y):
+    """
+    Like np.where, but returns x or y unchanged when condition is a scalar.
+    """
+    if isinstance(condition, (bool, np.bool_)):
+        return x if condition else y
+    return np.where(condition, x, y)
+
+def sqrt(x):
+    if isinstance(x, SCALARS):
+        return math.sqrt(x)
+    return np.sqrt(x)
+
+def refractive_index(n, wavelength):
+    """
+    Evaluate a refractive index, which is either a constant or a function of
+    wavelength.
+    """
+    if callable(n):
+        if wavelength is None:
+            raise ValueError("Dispersive elements require rays with a wavelength.")
+        return n(wavelength)
+    return n
+
+def is_symmetric(bins):
+    """
+    Return True if a list of bin edges is symmetric about zero, so that a
+    value and its negation fall into mirrored bins (values exactly on an edge
+    excepted).
+
+    An odd number of symmetric edges puts an edge at zero, and because bins
+    are half-open, zero doesn't fall into its own mirror image; since rays
+    often start on or are focused onto the axis, such bins aren't symmetric.
+    """
+    bins = np.asarray(bins)
+    return len(bins) % 2 == 0 and bool(np.allclose(bins, -bins[::-1]))
+
+def direction(th):
+    """
+    Return the unit direction vector (kz, kx) of a ray at angle th to the
+    z-axis.  Accepts scalars or arrays.
+    """
+    if isinstance(th, SCALARS):
+        return math.cos(th), math.sin(th)
+    return np.cos(th), np.sin(th)
+
+def angle(kz, kx):
+    """The inverse of direction; accepts scalars or arrays."""
+    if isinstance(kz, SCALARS) and isinstance(kx, SCALARS):
+        return math.atan2(kx, kz)
+    return np.arctan2(kx, kz)
+
 def rotate(x, y, theta):
-    x_new = x*np.cos(theta) - y*np.sin(theta)
-    y_new = x*np.sin(theta) + y*np.cos(theta)
+    return rotate_direction(x, y, *direction(theta))
+
+def rotate_direction(x, y, c, s):
+    """
+    Rotate (x, y) by the angle whose cosine and sine are c and s, e.g. by the
+    angle of a ray using its direction vector.  Accepts scalars or arrays.
+    """
+    x_new = x*c - y*s
+    y_new = x*s + y*c
     return x_new, y_new
 
 def ray_coordinates(ray, x, y):
@@ -17,7 +82,8 @@ def ray_coordinates(ray, x, y):
     the ray position defines the origin and the ray-direction defines the
     y-axis.
     """
-    return rotate(x - ray.x, y, ray.th)
+    kz, kx = ray.direction
+    return rotate_direction(x - ray.x, y, kz, kx)
 
 def standard_coordinates(ray, x, y):
     """
@@ -25,7 +91,8 @@ def standard_coordinates(ray, x, y):
     the ray position defines the origin and the ray-direction defines the
     y-axis, back to the standard coordinate system.
     """
-    x_new, y_new = rotate(x, y, -ray.th)
+    kz, kx = ray.direction
+    x_new, y_new = rotate_direction(x, y, kz, -kx)
     return x_new + ray.x, y_new
 
 def quadrant_atan(y, x):
@@ -40,3 +107,33 @@ def quadrant_atan(y, x):
             out = 2*pi - out
     return out
 
+def reflect(kz, kx, nz, nx):
+    """
+    Reflect the direction (kz, kx) off a surface with unit normal (nz, nx).
+    Accepts scalars or arrays.
+    """
+    dot = kz*nz + kx*nx
+    return kz - 2*dot*nz, kx - 2*dot*nx
+
+def refract(kz, kx, nz, nx, eta):
+    """
+    Refract the direction (kz, kx) through a surface with unit normal (nz, nx)
+    using Snell's law, where eta is the ratio of the refractive indices n1/n2.
+    Accepts scalars or arrays.
+
+    The normal must point against the incoming direction.  Rays which are
+    totally internally reflected are reflected off the surface instead.
+    """
+    cos_i = -(kz*nz + kx*nx)
+    k = 1 - eta**2*(1 - cos_i**2)
+    if isinstance(k, SCALARS):
+        if k < 0:
+            return kz + 2*cos_i*nz, kx + 2*cos_i*nx
+        c = eta*cos_i - math.sqrt(k)
+        return eta*kz + c*nz, eta*kx + c*nx
+
+    c = eta*cos_i - np.sqrt(np.maximum(k, 0))
+    tir = k < 0
+    kz_new = np.where(tir, kz + 2*cos_i*nz, eta*kz + c*nz)
+    kx_new = np.where(tir, kx + 2*cos_i*nx, eta*kx + c*nx)
+    return kz_new[()], kx_new[()]